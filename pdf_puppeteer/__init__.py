@@ -1,10 +1,20 @@
 __version__ = "1.0.0"
 
-# Import overrides to patch Frappe type validation early
-try:
-    from .overrides import pdf_generator_validation
-    pdf_generator_validation.apply_pdf_generator_validation_patch()
-except Exception as e:
-    # If import fails, log the error but don't crash
-    import frappe
-    frappe.log_error(f"PDF Puppeteer: Could not apply validation patch: {str(e)}", "PDF Puppeteer Init Error")
+# Whether the Frappe type validation patch has been applied in this process
+_PATCHED = [False]
+
+def apply_patch_once():
+    """
+    Patch Frappe type validation to accept 'puppeteer' the first time it is needed.
+    Runs from the before_request/before_job hooks instead of at import, so loading hooks stays cheap.
+    """
+    if _PATCHED[0]:
+        return
+    try:
+        from .overrides import pdf_generator_validation
+        # A failed attempt (e.g. frappe not fully loaded yet) is retried on the next request
+        _PATCHED[0] = pdf_generator_validation.apply_pdf_generator_validation_patch()
+    except Exception as e:
+        # If import fails, log the error but don't crash
+        import frappe
+        frappe.log_error(f"PDF Puppeteer: Could not apply validation patch: {str(e)}", "PDF Puppeteer Init Error")
@@ -0,0 +1,76 @@
+"""
+Shared helpers for the 'puppeteer' option on Print Format's pdf_generator field.
+"""
+
+import functools
+
+import frappe
+from frappe.custom.doctype.property_setter.property_setter import make_property_setter
+
+def get_pdf_generator_options():
+    """Return the stripped pdf_generator options of Print Format for the current site."""
+    return _pdf_generator_options(frappe.local.site)
+
+@functools.lru_cache(maxsize=16)
+def _pdf_generator_options(site):
+    # Keyed by site: one process may install or migrate several sites in turn
+    raw_options = frappe.get_meta("Print Format").get_field("pdf_generator").options or ""
+    return tuple(opt.strip() for opt in raw_options.split("\n") if opt.strip())
+
+def has_puppeteer_option():
+    """Check whether 'puppeteer' is already a pdf_generator option."""
+    # The options Property Setter answers this with one small query; the full DocType meta
+    # is only needed on first install, before any Property Setter exists
+    value = frappe.db.get_value(
+        "Property Setter",
+        {"doc_type": "Print Format", "field_name": "pdf_generator", "property": "options"},
+        "value",
+    )
+    if value is not None:
+        return "puppeteer" in (opt.strip() for opt in value.split("\n"))
+    return "puppeteer" in get_pdf_generator_options()
+
+def ensure_puppeteer_option():
+    """Add 'puppeteer' to the pdf_generator options. Returns False if it was already there."""
+    if has_puppeteer_option():
+        return False
+
+    _set_pdf_generator_options([*get_pdf_generator_options(), "puppeteer"])
+    return True
+
+def remove_puppeteer_option():
+    """Remove 'puppeteer' from the pdf_generator options. Returns False if it wasn't there."""
+    options = get_pdf_generator_options()
+    if "puppeteer" not in options:
+        return False
+
+    _set_pdf_generator_options([opt for opt in options if opt != "puppeteer"])
+    return True
+
+def delete_stale_option_setters():
+    """Delete options Property Setters written with the old "Select" property type."""
+    filters = {
+        "doc_type": "Print Format",
+        "field_name": "pdf_generator",
+        "property": "options",
+        "property_type": "Select",
+    }
+    if not frappe.db.exists("Property Setter", filters):
+        return False
+
+    frappe.db.delete("Property Setter", filters)
+    frappe.clear_cache(doctype="Print Format")
+    _pdf_generator_options.cache_clear()
+    return True
+
+def _set_pdf_generator_options(options):
+    # options is always stored as Text property regardless of underlying fieldtype
+    make_property_setter(
+        "Print Format",
+        "pdf_generator",
+        "options",
+        "\n".join(options),
+        "Text",
+        validate_fields_for_doctype=False,
+    )
+    _pdf_generator_options.cache_clear()
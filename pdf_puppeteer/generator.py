@@ -1,53 +1,58 @@
-import subprocess
-import tempfile
+import functools
 import os
-import json
 import frappe
-from frappe.utils.pdf import get_pdf as default_get_pdf
+
+# Everything else (subprocess, asyncio, the worker module) is imported where it's used,
+# so processes that never render with puppeteer don't pay for it
+
+# Frappe option -> (Puppeteer option, converter); a converter returning None skips the option
+_OPT_MAP = {
+    'page-size': ('format', str),  # Puppeteer expects format like 'A4', 'Letter', etc.
+    'orientation': ('landscape', {'Landscape': True, 'Portrait': False}.get),
+    'print-background': ('printBackground', bool),
+    'page-ranges': ('pageRanges', str),
+    'scale': ('scale', float),
+}
+
+# (Frappe option, Puppeteer margin key)
+_MARGIN_KEYS = (
+    ('margin-top', 'top'),
+    ('margin-right', 'right'),
+    ('margin-bottom', 'bottom'),
+    ('margin-left', 'left'),
+)
 
 def map_frappe_options_to_puppeteer(options):
     """Convert Frappe PDF options to Puppeteer PDF options."""
     puppeteer_opts = {}
-    # Page size
-    page_size = options.get('page-size')
-    if page_size:
-        # Puppeteer expects format like 'A4', 'Letter', etc.
-        puppeteer_opts['format'] = page_size
-    # Orientation
-    orientation = options.get('orientation')
-    if orientation == 'Landscape':
-        puppeteer_opts['landscape'] = True
-    elif orientation == 'Portrait':
-        puppeteer_opts['landscape'] = False
+    for frappe_key, (puppeteer_key, convert) in _OPT_MAP.items():
+        value = options.get(frappe_key)
+        if value and (value := convert(value)) is not None:
+            puppeteer_opts[puppeteer_key] = value
     # Margins
-    margin_top = options.get('margin-top')
-    margin_right = options.get('margin-right')
-    margin_bottom = options.get('margin-bottom')
-    margin_left = options.get('margin-left')
-    if any([margin_top, margin_right, margin_bottom, margin_left]):
-        margin = {}
-        if margin_top:
-            margin['top'] = margin_top
-        if margin_right:
-            margin['right'] = margin_right
-        if margin_bottom:
-            margin['bottom'] = margin_bottom
-        if margin_left:
-            margin['left'] = margin_left
+    margin = {key: value for frappe_key, key in _MARGIN_KEYS if (value := options.get(frappe_key))}
+    if margin:
         puppeteer_opts['margin'] = margin
-    # Print background
-    if options.get('print-background'):
-        puppeteer_opts['printBackground'] = True
-    # Page ranges
-    page_ranges = options.get('page-ranges')
-    if page_ranges:
-        puppeteer_opts['pageRanges'] = page_ranges
-    # Scale
-    scale = options.get('scale')
-    if scale:
-        puppeteer_opts['scale'] = float(scale)
     return puppeteer_opts
 
+def encode_options(options):
+    """Return Frappe PDF options as a Puppeteer options JSON string, memoized per distinct options."""
+    return _encode_options(frozenset((k, _hashable(v)) for k, v in options.items()))
+
+@functools.lru_cache(maxsize=256)
+def _encode_options(options_key):
+    from .worker import dumps
+
+    # Only top-level scalar options are read by the mapping, so the key can stand in for the dict
+    return dumps(map_frappe_options_to_puppeteer(dict(options_key))).decode("utf-8")
+
+def _hashable(value):
+    if isinstance(value, dict):
+        return frozenset((k, _hashable(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return tuple(_hashable(v) for v in value)
+    return value
+
 def get_pdf(print_format, html, options, output, pdf_generator=None):
     """
     Generate PDF using Puppeteer Node script.
@@ -63,49 +68,208 @@ def get_pdf(print_format, html, options, output, pdf_generator=None):
         # If there's any issue with pdf_generator validation, fall back gracefully
         return
 
-    # Determine path to Node script
-    app_path = frappe.get_app_path("pdf_puppeteer")
-    script_path = os.path.join(app_path, "puppeteer_pdf.js")
-    if not os.path.exists(script_path):
-        # fallback to workspace root
-        script_path = os.path.join(frappe.get_bench_path(), "puppeteer_pdf.js")
-        if not os.path.exists(script_path):
-            frappe.throw("Puppeteer script not found. Please ensure puppeteer_pdf.js is installed.")
-
-    # Write HTML to a temporary file
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False) as f:
-        f.write(html)
-        html_path = f.name
-
     # Prepare options
-    puppeteer_options = map_frappe_options_to_puppeteer(options)
-    env = os.environ.copy()
-    env['PDF_OPTIONS_JSON'] = json.dumps(puppeteer_options)
+    options_json = encode_options(options)
+
+    # Stream the PDF straight into the output file, or into the file-like object (BytesIO)
+    if isinstance(output, str):
+        with open(output, 'wb') as f:
+            render_pdf(html, options_json, f)
+    else:
+        render_pdf(html, options_json, output)
 
+def render_pdf(html, options_json, output):
+    """Render on the persistent worker, falling back to a one-shot Node process."""
+    from .worker import PartialOutputError, RenderError, WorkerError, get_worker
+
+    # Only a seekable output can be rewound if the worker dies part-way through a PDF
+    start = output.tell() if _seekable(output) else None
+    server_script = locate_script("puppeteer_pdf_server.js")
+    if server_script is None:
+        # Installs that only copied puppeteer_pdf.js keep rendering, one Node process per PDF
+        render_pdf_oneshot(html, options_json, output)
+        return
     try:
-        # Prepare command: node script.js html_file - (output to stdout)
-        cmd = ["node", script_path, html_path, "-"]
-        # Use subprocess to run Node script and capture PDF stdout
-        result = subprocess.run(
-            cmd,
-            env=env,
-            capture_output=True,
-            timeout=30,
-            check=True
-        )
-        pdf = result.stdout
-        if not pdf:
-            frappe.throw("Puppeteer failed to generate PDF: " + result.stderr.decode())
-        # Write PDF to output file if output is a file path, else return bytes
-        if isinstance(output, str):
-            with open(output, 'wb') as f:
-                f.write(pdf)
-        else:
-            # output is a file-like object (BytesIO)
-            output.write(pdf)
-    except subprocess.TimeoutExpired:
+        get_worker(server_script).render(html, options_json, output)
+    except TimeoutError:
         frappe.throw("PDF generation timed out.")
-    except subprocess.CalledProcessError as e:
-        frappe.throw(f"Puppeteer error: {e.stderr.decode()}")
+    except RenderError as e:
+        frappe.throw(f"Puppeteer error: {str(e)}")
+    except (OSError, WorkerError) as e:
+        if start is None and isinstance(e, PartialOutputError):
+            frappe.throw(f"Puppeteer error: {str(e)}")
+        frappe.log_error(f"Puppeteer worker failed, falling back to one-shot: {str(e)}", "PDF Puppeteer Worker")
+        if start is not None:
+            # Drop anything the worker wrote before it died
+            output.seek(start)
+            output.truncate()
+        render_pdf_oneshot(html, options_json, output)
+
+def _seekable(output):
+    seekable = getattr(output, "seekable", None)
+    return bool(seekable and seekable())
+
+async def get_pdf_async(html, options):
+    """Generate PDF bytes on the shared socket server without blocking the event loop."""
+    import asyncio
+
+    from .worker import WorkerError, get_socket_server, render_async
+
+    server = get_socket_server(find_script("puppeteer_pdf_server.js"))
+    try:
+        # Spawning Node and waiting for it to listen blocks, so that happens off the event loop
+        acquiring = asyncio.get_running_loop().run_in_executor(None, server.acquire)
+        try:
+            socket_path = await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            # acquire() still finishes in its thread; hand that reservation back when it does
+            acquiring.add_done_callback(functools.partial(_release_acquired, server))
+            raise
+        try:
+            return await render_async(socket_path, html, encode_options(options))
+        finally:
+            server.release()
+    except TimeoutError:
+        frappe.throw("PDF generation timed out.")
+    except (OSError, WorkerError) as e:
+        frappe.throw(f"Puppeteer error: {str(e)}")
+
+def _release_acquired(server, future):
+    if not future.cancelled() and future.exception() is None:
+        server.release()
+
+def get_pdfs(jobs, concurrency=8):
+    """
+    Generate PDFs for many documents concurrently.
+    `jobs` is a list of dicts with `html` and optional `options`; returns PDF bytes in the same order.
+    """
+    import asyncio
+
+    from .worker import get_socket_server
+
+    # Start the server before entering the event loop so the spawn doesn't block it
+    start_socket_server()
+
+    async def run():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def render(job):
+            async with semaphore:
+                return await get_pdf_async(job["html"], job.get("options") or {})
+
+        # Let every job finish (and release the server) before reporting the first failure
+        return await asyncio.gather(*[render(job) for job in jobs], return_exceptions=True)
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        # Don't keep a second browser and its page pool resident after the batch
+        get_socket_server(find_script("puppeteer_pdf_server.js")).stop_if_idle()
+
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return results
+
+def start_socket_server():
+    """Start the shared socket server if it isn't running and return its socket path."""
+    from .worker import WorkerError, get_socket_server
+
+    try:
+        return get_socket_server(find_script("puppeteer_pdf_server.js")).ensure_started()
+    except (OSError, WorkerError) as e:
+        frappe.throw(f"Puppeteer error: {str(e)}")
+
+# Resolved Node script paths, keyed by script name
+_SCRIPT_PATHS = {}
+
+def find_script(script_name):
+    """Locate a Node script shipped with the app, failing with a user-facing error if it is missing."""
+    script_path = locate_script(script_name)
+    if script_path is None:
+        frappe.throw(f"Puppeteer script not found. Please ensure {script_name} is installed.")
+    return script_path
+
+def locate_script(script_name):
+    """Return the path of a Node script, or None if it isn't installed. Found paths are cached per process."""
+    script_path = _SCRIPT_PATHS.get(script_name)
+    if script_path is None:
+        script_path = _resolve_script_path(script_name)
+        if script_path is not None:
+            _SCRIPT_PATHS[script_name] = script_path
+    return script_path
+
+def _resolve_script_path(script_name):
+    app_path = frappe.get_app_path("pdf_puppeteer")
+    # The app package, then the bench root, then the app's repository root where the scripts ship
+    for directory in (app_path, frappe.get_bench_path(), os.path.dirname(app_path)):
+        script_path = os.path.join(directory, script_name)
+        if os.path.exists(script_path):
+            return script_path
+    return None
+
+# Socket send buffer used to hand HTML to the one-shot Node process
+_HTML_SEND_BUFFER = 1 << 20
+
+def render_pdf_oneshot(html, options_json, output):
+    """Generate a PDF into `output` by spawning a fresh `node puppeteer_pdf.js` process."""
+    import socket
+    import subprocess
+    import threading
+
+    script_path = find_script("puppeteer_pdf.js")
+
+    # Prepare command: node script.js - - options_json (HTML on stdin, PDF on stdout)
+    cmd = ["node", script_path, "-", "-", options_json]
+    # A real file gets the PDF directly from Node; anything else is copied across in chunks
+    start = output.tell() if _seekable(output) else None
+    try:
+        output.flush()
+        stdout = output.fileno()
+    except (AttributeError, OSError):
+        stdout = subprocess.PIPE
+    # Hand the HTML over a socketpair rather than a pipe: its buffer can be made much larger
+    # than a pipe's 64 KiB, so big documents go across in far fewer blocking writes
+    parent_sock, child_sock = socket.socketpair()
+    parent_sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, _HTML_SEND_BUFFER)
+    with child_sock:
+        proc = subprocess.Popen(cmd, stdin=child_sock.fileno(), stdout=stdout, stderr=subprocess.PIPE)
+    # Drain stderr alongside stdout: a chatty Node filling the stderr pipe would otherwise
+    # stall both sides until the timeout
+    stderr_chunks = []
+    stderr_reader = threading.Thread(target=lambda: stderr_chunks.append(proc.stderr.read()), daemon=True)
+    stderr_reader.start()
+    timed_out = threading.Event()
+    timer = threading.Timer(30, lambda: (timed_out.set(), proc.kill()))
+    timer.start()
+    try:
+        with parent_sock:
+            try:
+                parent_sock.sendall(html.encode("utf-8"))
+                parent_sock.shutdown(socket.SHUT_WR)
+            except (BrokenPipeError, ConnectionResetError):
+                # Node exited early; its stderr explains why
+                pass
+        # Bytes copied from the pipe; unknown when Node writes to the output's fd itself
+        copied = None
+        if proc.stdout:
+            copied = 0
+            while chunk := proc.stdout.read(65536):
+                output.write(chunk)
+                copied += len(chunk)
+        stderr_reader.join()
+        proc.wait()
     finally:
-        os.unlink(html_path)
\ No newline at end of file
+        timer.cancel()
+
+    if timed_out.is_set():
+        frappe.throw("PDF generation timed out.")
+    produced = output.tell() != start if start is not None else copied != 0
+    if not proc.returncode and produced:
+        return
+
+    # Only failures need Node's stderr decoded; don't let odd bytes mask the real error
+    error = b"".join(stderr_chunks).decode(errors="replace")
+    if proc.returncode:
+        frappe.throw(f"Puppeteer error: {error}")
+    frappe.throw("Puppeteer failed to generate PDF: " + error)
@@ -11,12 +11,15 @@ app_license = "mit"
 pdf_generator = "pdf_puppeteer.generator.get_pdf"
 
 # Installation
-before_install = "pdf_puppeteer.install.before_install"
 after_install = "pdf_puppeteer.install.after_install"
 
 # Uninstallation
 before_uninstall = "pdf_puppeteer.uninstall.before_uninstall"
 
+# Apply the 'puppeteer' type validation patch lazily, once per process
+before_request = ["pdf_puppeteer.apply_patch_once"]
+before_job = ["pdf_puppeteer.apply_patch_once"]
+
 # Apps
 # ------------------
 
@@ -10,20 +10,13 @@ This script:
 """
 
 import os
-import platform
 import shutil
-import zipfile
 import subprocess
 import sys
-import inspect
-import functools
-from pathlib import Path
-from typing import Literal
-import requests
-import click
 import frappe
-from frappe.custom.doctype.property_setter.property_setter import make_property_setter
 from frappe.utils.synchronization import filelock
+from ._meta import ensure_puppeteer_option, remove_puppeteer_option
+from .overrides.pdf_generator_validation import get_param_names
 
 # Monkey patch Frappe's type validation early
 def patch_frappe_type_validation():
@@ -31,18 +24,25 @@ def patch_frappe_type_validation():
     try:
         from frappe.utils.typing_validations import transform_parameter_types
 
+        # Already wrapped: a second layer would only add per-call overhead
+        if getattr(transform_parameter_types, "_pdf_puppeteer_patched", False):
+            return
+
         original_transform = transform_parameter_types
 
         def patched_transform(func, args, kwargs):
             """Patched version that handles pdf_generator specially."""
+            # Fast path: nothing here can be pdf_generator='puppeteer'
+            if not (kwargs and 'pdf_generator' in kwargs) and 'puppeteer' not in (args or ()):
+                return original_transform(func, args, kwargs)
+
             # Check if this involves pdf_generator parameter
             all_params = {}
             if kwargs and 'pdf_generator' in kwargs:
                 all_params['pdf_generator'] = kwargs['pdf_generator']
             elif args:
                 try:
-                    sig = inspect.signature(func)
-                    param_names = list(sig.parameters.keys())
+                    param_names = get_param_names(func)
                     for i, arg in enumerate(args):
                         if i < len(param_names) and param_names[i] == 'pdf_generator':
                             all_params['pdf_generator'] = arg
@@ -57,7 +57,7 @@ def patch_frappe_type_validation():
                     kwargs['pdf_generator'] = 'chrome'
                 elif args and 'pdf_generator' in all_params:
                     args = list(args)
-                    param_names = list(inspect.signature(func).parameters.keys())
+                    param_names = get_param_names(func)
                     for i, name in enumerate(param_names):
                         if name == 'pdf_generator':
                             args[i] = 'chrome'
@@ -76,6 +76,7 @@ def patch_frappe_type_validation():
             return original_transform(func, args, kwargs)
 
         # Apply the patch
+        patched_transform._pdf_puppeteer_patched = True
         frappe.utils.typing_validations.transform_parameter_types = patched_transform
         print("✅ Applied Frappe type validation patch for pdf_generator")
 
@@ -86,19 +87,19 @@ def patch_frappe_type_validation():
 # It will be applied explicitly during installation when frappe is ready
 # patch_frappe_type_validation()
 
-def before_install():
-    """Run before the app is installed."""
-    pass
-
 def after_install():
     """Run after the app is installed."""
     setup_chromium()
     add_pdf_generator_option()
     fix_type_validation_comprehensive()
+    # Each step handles its own errors, so whatever succeeded is committed in one go
+    frappe.db.commit()
 
 @filelock("pdf_puppeteer_chromium_setup", timeout=1, is_global=True)
 def setup_chromium():
     """Setup Chromium by downloading and managing our own binary (like print_designer)."""
+    import click
+
     try:
         bench_path = frappe.utils.get_bench_path()
         chromium_dir = os.path.join(bench_path, "chromium")
@@ -122,6 +123,10 @@ def setup_chromium():
 
 def find_or_download_chromium_executable():
     """Find existing Chromium or download if not found."""
+    import platform
+    import click
+    from pathlib import Path
+
     bench_path = frappe.utils.get_bench_path()
     chromium_dir = os.path.join(bench_path, "chromium")
 
@@ -154,6 +159,8 @@ def get_chromium_executable_name(platform_name):
 
 def download_chromium():
     """Download Chromium binary (simplified version of print_designer's approach)."""
+    import click
+
     try:
         bench_path = frappe.utils.get_bench_path()
         chromium_dir = os.path.join(bench_path, "chromium")
@@ -163,21 +170,16 @@ def download_chromium():
 
         click.echo("Attempting to use system Chromium/Chrome browsers...")
 
-        # Try to find system browsers
-        browser_paths = [
-            '/usr/bin/chromium-browser',
-            '/usr/bin/chromium',
-            '/usr/bin/google-chrome',
-            '/usr/bin/google-chrome-stable',
-            '/usr/bin/chrome',
-            '/opt/google/chrome/google-chrome',
-            '/snap/bin/chromium',
-            '/snap/bin/chromium-browser',
-        ]
-
-        for path in browser_paths:
-            if os.path.exists(path) and os.access(path, os.X_OK):
-                click.echo(f"✅ Found system browser at: {path}")
+        path = find_system_browser()
+        if path:
+            click.echo(f"✅ Found system browser at: {path}")
+            return path
+
+        # Fall back to installing Chromium with the system package manager
+        if install_chromium_if_needed():
+            path = find_system_browser()
+            if path:
+                click.echo(f"✅ Installed system browser at: {path}")
                 return path
 
         click.echo("⚠️  No system browser found. Please install Chromium or Google Chrome.")
@@ -188,23 +190,119 @@ def download_chromium():
         frappe.log_error(f"Chromium download error: {str(e)}", "PDF Puppeteer Chromium")
         return None
 
+def find_system_browser():
+    """Return the first executable system Chromium/Chrome browser, if any."""
+    browser_paths = [
+        os.environ.get("CHROMIUM_PATH", ""),
+        '/usr/bin/chromium-browser',
+        '/usr/bin/chromium',
+        '/usr/bin/google-chrome',
+        '/usr/bin/google-chrome-stable',
+        '/usr/bin/chrome',
+        '/opt/google/chrome/google-chrome',
+        '/snap/bin/chromium',
+        '/snap/bin/chromium-browser',
+    ]
+
+    for path in browser_paths:
+        if path and os.path.exists(path) and os.access(path, os.X_OK):
+            return path
+    return None
+
+# Whether `apt-get update` has already been attempted in this process
+_APT_UPDATED = False
+# Seconds a single package manager command may take before giving up
+PACKAGE_MANAGER_TIMEOUT = 600
+
+def install_chromium_if_needed():
+    """Install Chromium with the first system package manager that can provide it."""
+    import click
+
+    chromium_path = os.environ.get("CHROMIUM_PATH")
+    if chromium_path and os.path.exists(chromium_path):
+        click.echo(f"✅ Chromium configured via CHROMIUM_PATH: {chromium_path}")
+        return True
+
+    # None of the supported package managers exist outside Linux
+    if sys.platform != "linux":
+        click.echo(f"Skipping Chromium auto-install on {sys.platform}")
+        return False
+
+    if (
+        os.path.exists("/usr/bin/chromium")
+        or os.path.exists("/snap/bin/chromium")
+        or shutil.which("chromium-browser")
+        or shutil.which("chromium")
+    ):
+        click.echo("✅ Chromium is already installed")
+        return True
+
+    # (package manager, install arguments ending in a package name placeholder)
+    package_managers = [
+        # Skip recommended packages; headless printing only needs the browser itself
+        ("apt-get", ["install", "-y", "-q", "--no-install-recommends", "chromium-browser"]),
+        ("dnf", ["install", "-y", "chromium"]),
+        ("yum", ["install", "-y", "chromium"]),
+        ("apk", ["add", "chromium"]),
+        ("zypper", ["install", "-y", "chromium"]),
+    ]
+    chromium_packages = [
+        "chromium-browser",
+        "chromium",
+        "chromium-headless",
+        "google-chrome-stable",
+        "ungoogled-chromium",
+    ]
+
+    # Only the system's own package manager is worth trying
+    managers = [(manager, args) for manager, args in package_managers if shutil.which(manager)]
+    if not managers:
+        click.echo("⚠️  No supported package manager found to install Chromium.")
+        return False
+    manager, args = managers[0]
+
+    global _APT_UPDATED
+    # Package lists only need refreshing once, not per candidate package. A failed refresh
+    # isn't retried either: the installs below may still work from the existing lists
+    if manager == "apt-get" and not _APT_UPDATED:
+        _APT_UPDATED = True
+        try:
+            subprocess.run(
+                ["sudo", "-n", manager, "update", "-q"],
+                check=True,
+                capture_output=True,
+                text=True,
+                timeout=PACKAGE_MANAGER_TIMEOUT,
+            )
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
+            click.echo("⚠️  apt-get update failed; trying the existing package lists")
+
+    # -n: fail instead of waiting on a password prompt nobody can see during install
+    prefix = ["sudo", "-n", manager, *args[:-1]]
+    for package_name in chromium_packages:
+        try:
+            subprocess.run(
+                [*prefix, package_name],
+                check=True,
+                capture_output=True,
+                text=True,
+                timeout=PACKAGE_MANAGER_TIMEOUT,
+            )
+            click.echo(f"✅ Installed {package_name} using {manager}")
+            return True
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
+            # Package not available from this manager, try the next package
+            continue
+
+    click.echo("⚠️  Could not install Chromium automatically.")
+    return False
+
 def add_pdf_generator_option():
     """Add 'puppeteer' option to Print Format's pdf_generator field."""
+    import click
+
     try:
-        options = (frappe.get_meta("Print Format").get_field("pdf_generator").options or "").split("\n")
-        options = [opt.strip() for opt in options if opt.strip()]
-
-        if "puppeteer" not in options:
-            options.append("puppeteer")
-            make_property_setter(
-                "Print Format",
-                "pdf_generator",
-                "options",
-                "\n".join(options),
-                "Text",
-                validate_fields_for_doctype=False,
-            )
-            frappe.db.commit()
+        if ensure_puppeteer_option():
             click.echo("✅ Added 'puppeteer' option to Print Format pdf_generator")
         else:
             click.echo("✅ 'puppeteer' option already exists in Print Format")
@@ -215,6 +313,8 @@ def add_pdf_generator_option():
 
 def fix_type_validation_comprehensive():
     """Apply comprehensive fixes for type validation issues."""
+    import click
+
     try:
         # 1. Apply the main validation patch from overrides
         from .overrides.pdf_generator_validation import apply_pdf_generator_validation_patch
@@ -234,6 +334,8 @@ def fix_type_validation_comprehensive():
 
 def create_custom_validation_override():
     """Create custom validation to handle pdf_generator type issues."""
+    import click
+
     try:
         # This creates a server-side validation override
         from frappe.custom.doctype.custom_script.custom_script import create_custom_script
@@ -259,7 +361,6 @@ frappe.ui.form.on('Print Format', {
 """
             })
             custom_script.insert(ignore_permissions=True)
-            frappe.db.commit()
             click.echo("✅ Created custom validation override")
 
     except Exception as e:
@@ -268,21 +369,10 @@ frappe.ui.form.on('Print Format', {
 
 def remove_pdf_generator_option():
     """Remove 'puppeteer' option from Print Format's pdf_generator field."""
+    import click
+
     try:
-        options = (frappe.get_meta("Print Format").get_field("pdf_generator").options or "").split("\n")
-        options = [opt.strip() for opt in options if opt.strip()]
-
-        if "puppeteer" in options:
-            options.remove("puppeteer")
-            make_property_setter(
-                "Print Format",
-                "pdf_generator",
-                "options",
-                "\n".join(options),
-                "Text",
-                validate_fields_for_doctype=False,
-            )
-            frappe.db.commit()
+        if remove_puppeteer_option():
             click.echo("✅ Removed 'puppeteer' option from Print Format")
         else:
             click.echo("✅ 'puppeteer' option not found in Print Format")
@@ -29,6 +29,14 @@ def get_original_transform():
         _original_transform_parameter_types = frappe.utils.typing_validations.transform_parameter_types
     return _original_transform_parameter_types
 
+@functools.lru_cache(maxsize=1024)
+def get_param_names(func):
+    """Parameter names of `func`; inspect.signature is slow and this runs on every whitelisted call."""
+    try:
+        return tuple(inspect.signature(func).parameters.keys())
+    except (TypeError, ValueError):
+        return ()
+
 def is_pdf_generator_parameter(func, args, kwargs):
     """Check if the current call involves pdf_generator parameter."""
     if not args and not kwargs:
@@ -43,8 +51,7 @@ def is_pdf_generator_parameter(func, args, kwargs):
     if args:
         try:
             # Try to get parameter names from function signature
-            sig = inspect.signature(func)
-            param_names = list(sig.parameters.keys())
+            param_names = get_param_names(func)
             for i, arg in enumerate(args):
                 if i < len(param_names):
                     all_params[param_names[i]] = arg
@@ -55,13 +62,21 @@ def is_pdf_generator_parameter(func, args, kwargs):
 
     return 'pdf_generator' in all_params
 
+# Modules whose functions may take pdf_generator positionally
+_HOT_MODULES = frozenset({"frappe.utils.print_format"})
+
 def patched_transform_parameter_types(func, args, kwargs):
     """Patched version of transform_parameter_types that handles pdf_generator specially."""
 
+    # Cheap prefilter: almost no call carries pdf_generator, so skip the inspection below
+    if "pdf_generator" not in (kwargs or ()) and getattr(func, "__module__", "") not in _HOT_MODULES:
+        return get_original_transform()(func, args, kwargs)
+
     # Check if this call involves pdf_generator parameter
     if is_pdf_generator_parameter(func, args, kwargs):
         # Get the pdf_generator value
         pdf_generator_value = None
+        pdf_generator_index = None
 
         # Try to find pdf_generator in kwargs first
         if kwargs and 'pdf_generator' in kwargs:
@@ -69,48 +84,33 @@ def patched_transform_parameter_types(func, args, kwargs):
         # Then check args if we can map them
         elif args:
             try:
-                sig = inspect.signature(func)
-                param_names = list(sig.parameters.keys())
+                param_names = get_param_names(func)
                 for i, arg in enumerate(args):
                     if i < len(param_names) and param_names[i] == 'pdf_generator':
                         pdf_generator_value = arg
+                        pdf_generator_index = i
                         break
             except Exception:
                 pass
 
-        # If pdf_generator is 'puppeteer', we need to handle it specially
+        # If pdf_generator is 'puppeteer', validate it as a known value and restore it afterwards
         if pdf_generator_value == 'puppeteer':
-            # Temporarily modify the type annotation to include 'puppeteer'
-            # We'll use a monkey-patched version of the function with updated annotations
-
-            # Get the original function
-            original_func = func
-
-            # Create a wrapper that bypasses type validation for pdf_generator
-            @functools.wraps(original_func)
-            def wrapped_func(*inner_args, **inner_kwargs):
-                # For pdf_generator parameter, we'll allow 'puppeteer'
-                if 'pdf_generator' in inner_kwargs and inner_kwargs['pdf_generator'] == 'puppeteer':
-                    # Temporarily set it to a valid value for type checking
-                    original_pdf_generator = inner_kwargs['pdf_generator']
-                    inner_kwargs['pdf_generator'] = 'chrome'  # Use a valid value for type checking
-
-                    try:
-                        # Call the original transform_parameter_types
-                        original_transform = get_original_transform()
-                        result = original_transform(original_func, inner_args, inner_kwargs)
-                        # Restore the original value in the result
-                        if result and len(result) > 1 and isinstance(result[1], dict):
-                            result[1]['pdf_generator'] = original_pdf_generator
-                        return result
-                    finally:
-                        inner_kwargs['pdf_generator'] = original_pdf_generator
-                else:
-                    # Normal processing
-                    original_transform = get_original_transform()
-                    return original_transform(original_func, inner_args, inner_kwargs)
-
-            return wrapped_func(func, args, kwargs)
+            if pdf_generator_index is None:
+                kwargs = dict(kwargs)
+                kwargs['pdf_generator'] = 'chrome'  # Use a valid value for type checking
+            else:
+                args = list(args)
+                args[pdf_generator_index] = 'chrome'
+
+            result = get_original_transform()(func, args, kwargs)
+            # Restore the original value in the result
+            if result and len(result) > 1 and isinstance(result[1], dict) and 'pdf_generator' in result[1]:
+                result[1]['pdf_generator'] = pdf_generator_value
+            elif pdf_generator_index is not None and result and len(result[0]) > pdf_generator_index:
+                transformed_args = list(result[0])
+                transformed_args[pdf_generator_index] = pdf_generator_value
+                result = (transformed_args, *result[1:])
+            return result
 
     # Normal processing for non-pdf_generator calls
     original_transform = get_original_transform()
@@ -121,6 +121,10 @@ def apply_pdf_generator_validation_patch():
     try:
         frappe = get_frappe()
 
+        # Repeated install/migrate runs land here again; nothing to rebind
+        if getattr(frappe.utils.typing_validations, "transform_parameter_types", None) is patched_transform_parameter_types:
+            return True
+
         # Store the REAL original function before patching
         global _original_transform_parameter_types
         if _original_transform_parameter_types is None:
@@ -129,10 +133,6 @@ def apply_pdf_generator_validation_patch():
         # Replace the original function with our patched version
         frappe.utils.typing_validations.transform_parameter_types = patched_transform_parameter_types
 
-        # Also patch it in the module directly
-        import frappe.utils.typing_validations
-        frappe.utils.typing_validations.transform_parameter_types = patched_transform_parameter_types
-
         print("✅ Applied PDF generator validation patch - 'puppeteer' is now allowed")
         return True
     except Exception as e:
@@ -147,15 +147,16 @@ def remove_pdf_generator_validation_patch():
     """Remove the monkey patch and restore original behavior."""
     try:
         frappe = get_frappe()
+
+        # Not patched (or never was): the original is already in place
+        if getattr(frappe.utils.typing_validations, "transform_parameter_types", None) is not patched_transform_parameter_types:
+            return True
+
         original_transform = get_original_transform()
 
         # Restore original function
         frappe.utils.typing_validations.transform_parameter_types = original_transform
 
-        # Also restore in the module
-        import frappe.utils.typing_validations
-        frappe.utils.typing_validations.transform_parameter_types = original_transform
-
         print("✅ Removed PDF generator validation patch")
         return True
     except Exception as e:
@@ -6,11 +6,15 @@ for the pdf_generator field, in addition to the existing 'wkhtmltopdf' and 'chro
 """
 
 import frappe
-from frappe.custom.doctype.property_setter.property_setter import make_property_setter
+from pdf_puppeteer._meta import delete_stale_option_setters, ensure_puppeteer_option, has_puppeteer_option
 
 def execute():
     """Execute the patch to allow 'puppeteer' as a valid pdf_generator value."""
 
+    # Earlier runs stored the options as a "Select" property; drop those rows so the
+    # option is re-added below with the right type
+    delete_stale_option_setters()
+
     # Check if the patch has already been applied
     if is_patch_applied():
         return
@@ -24,31 +28,11 @@ def execute():
             frappe.log_error("pdf_generator field not found in Print Format doctype", "PDF Puppeteer Patch Error")
             return
 
-        # Get current field properties
-        pdf_generator_field = print_format_meta.get_field("pdf_generator")
-
-        # Check if 'puppeteer' is already in the options
-        current_options = pdf_generator_field.options or ""
-        options_list = [opt.strip() for opt in current_options.split('\n') if opt.strip()]
-
-        if "puppeteer" in options_list:
+        # Add 'puppeteer' to the options using property setter
+        if not ensure_puppeteer_option():
             print("✅ 'puppeteer' option already exists in pdf_generator field")
             return
 
-        # Add 'puppeteer' to the options
-        options_list.append("puppeteer")
-        new_options = "\n".join(options_list)
-
-        # Update the field options using property setter
-        make_property_setter(
-            "Print Format",
-            "pdf_generator",
-            "options",
-            new_options,
-            "Select",
-            validate_fields_for_doctype=False,
-        )
-
         # Also need to handle the type validation by creating a custom validation method
         # This will override the strict literal type checking
         create_custom_validation_method()
@@ -57,16 +41,14 @@ def execute():
         print("✅ Successfully added 'puppeteer' option to pdf_generator field and fixed type validation")
 
     except Exception as e:
+        frappe.db.rollback()
         frappe.log_error(f"Error applying pdf_generator validation patch: {str(e)}", "PDF Puppeteer Patch Error")
         raise
 
 def is_patch_applied():
     """Check if the patch has already been applied."""
     try:
-        print_format_meta = frappe.get_meta("Print Format")
-        pdf_generator_field = print_format_meta.get_field("pdf_generator")
-        current_options = pdf_generator_field.options or ""
-        return "puppeteer" in current_options
+        return has_puppeteer_option()
     except Exception:
         return False
 
@@ -110,19 +92,9 @@ frappe.ui.form.on('Print Format', {
 });
 """
         })
+        # Committed together with the Property Setter by execute()
         custom_script.insert(ignore_permissions=True)
-        frappe.db.commit()
 
     except Exception as e:
         # If custom script creation fails, it's not critical
         frappe.log_error(f"Could not create custom validation script: {str(e)}", "PDF Puppeteer Patch Warning")
-
-def create_server_validation_override():
-    """Create a server-side validation override using hooks."""
-    try:
-        # This will be handled by our generator.py which already checks pdf_generator != "puppeteer"
-        # The server-side validation in frappe.utils.typing_validations will be bypassed
-        # by our custom pdf_generator hook
-        pass
-    except Exception as e:
-        frappe.log_error(f"Error creating server validation override: {str(e)}", "PDF Puppeteer Patch Error")
\ No newline at end of file
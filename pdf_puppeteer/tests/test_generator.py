@@ -0,0 +1,111 @@
+"""
+Tests for the Frappe-to-Puppeteer option mapping and the batch API.
+"""
+
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import frappe
+
+from pdf_puppeteer import generator, worker
+from pdf_puppeteer.generator import get_pdf_async, get_pdfs, map_frappe_options_to_puppeteer
+from pdf_puppeteer.tests.test_worker import STUB_SERVER
+
+class TestMapFrappeOptionsToPuppeteer(unittest.TestCase):
+    def test_full_options(self):
+        options = {
+            "page-size": "A4",
+            "orientation": "Landscape",
+            "margin-top": "15mm",
+            "margin-right": "10mm",
+            "margin-bottom": "15mm",
+            "margin-left": "10mm",
+            "print-background": True,
+            "page-ranges": "1-2",
+            "scale": "0.8",
+            "encoding": "UTF-8",
+        }
+        self.assertEqual(
+            map_frappe_options_to_puppeteer(options),
+            {
+                "format": "A4",
+                "landscape": True,
+                "margin": {"top": "15mm", "right": "10mm", "bottom": "15mm", "left": "10mm"},
+                "printBackground": True,
+                "pageRanges": "1-2",
+                "scale": 0.8,
+            },
+        )
+
+    def test_empty_options(self):
+        self.assertEqual(map_frappe_options_to_puppeteer({}), {})
+
+    def test_orientation(self):
+        self.assertEqual(map_frappe_options_to_puppeteer({"orientation": "Portrait"}), {"landscape": False})
+        self.assertEqual(map_frappe_options_to_puppeteer({"orientation": "landscape"}), {})
+        self.assertEqual(map_frappe_options_to_puppeteer({"orientation": ""}), {})
+
+    def test_false_print_background_is_omitted(self):
+        self.assertEqual(map_frappe_options_to_puppeteer({"print-background": False}), {})
+        self.assertEqual(map_frappe_options_to_puppeteer({"print-background": 0}), {})
+
+    def test_margin_subset(self):
+        self.assertEqual(
+            map_frappe_options_to_puppeteer({"margin-top": "5mm", "margin-left": "", "margin-bottom": "0"}),
+            {"margin": {"top": "5mm", "bottom": "0"}},
+        )
+
+    def test_scale_is_a_float(self):
+        self.assertEqual(map_frappe_options_to_puppeteer({"scale": 1}), {"scale": 1.0})
+        self.assertEqual(map_frappe_options_to_puppeteer({"scale": 0}), {})
+
+@unittest.skipUnless(shutil.which("node"), "node is not installed")
+class TestBatchRendering(unittest.TestCase):
+    """get_pdfs/get_pdf_async against the stub server from test_worker."""
+
+    def setUp(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        script = os.path.join(tmpdir, "stub_server.js")
+        with open(script, "w") as f:
+            f.write(STUB_SERVER)
+
+        self.server = worker.PuppeteerSocketServer(script, pool_size=3)
+        self.addCleanup(self.server.stop)
+        for patcher in (
+            mock.patch.object(generator, "find_script", lambda script_name: script),
+            mock.patch.object(worker, "_socket_server", self.server),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_get_pdfs(self):
+        self.assertEqual(get_pdfs([{"html": "a"}, {"html": "b", "options": {}}]), [b"%PDF-a|3", b"%PDF-b|3"])
+        self.assertFalse(self.server.is_alive())
+
+    def test_failed_job_releases_the_server(self):
+        jobs = [{"html": "error:bad html" if i % 4 == 1 else str(i)} for i in range(12)]
+        for _ in range(5):
+            with self.assertRaises(frappe.ValidationError):
+                get_pdfs(jobs, concurrency=4)
+            self.assertEqual(self.server.active, 0)
+            self.assertFalse(self.server.is_alive())
+
+    def test_cancelled_requests_release_the_server(self):
+        async def run():
+            tasks = [asyncio.create_task(get_pdf_async(str(i), {})) for i in range(6)]
+            # Let the first task start the server in the executor, then cancel everything
+            await asyncio.sleep(0.05)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        asyncio.run(run())
+        self.assertEqual(self.server.active, 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+"""
+Tests for the transform_parameter_types override that lets 'puppeteer' through Frappe's
+Literal validation of pdf_generator, run against a fake original transform.
+"""
+
+import unittest
+from unittest import mock
+
+from pdf_puppeteer.overrides import pdf_generator_validation
+from pdf_puppeteer.overrides.pdf_generator_validation import patched_transform_parameter_types
+
+def download_pdf(doctype, name, format=None, doc=None, no_letterhead=0, language=None, letterhead=None, pdf_generator=None):
+    pass
+
+# Frappe's own download_pdf lives here, which is what lets positional pdf_generator through the prefilter
+download_pdf.__module__ = "frappe.utils.print_format"
+
+def unrelated(doctype, name):
+    pass
+
+class TestPatchedTransformParameterTypes(unittest.TestCase):
+    def setUp(self):
+        self.seen = []
+        patcher = mock.patch.object(pdf_generator_validation, "_original_transform_parameter_types", self.fake_transform)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fake_transform(self, func, args, kwargs):
+        """Record what validation saw and return copies, as Frappe's transform does."""
+        self.seen.append((list(args or ()), dict(kwargs or {})))
+        return list(args or ()), dict(kwargs or {})
+
+    def test_puppeteer_kwarg_is_validated_as_chrome_and_restored(self):
+        kwargs = {"doctype": "Sales Invoice", "name": "SINV-0001", "pdf_generator": "puppeteer"}
+        args, result_kwargs = patched_transform_parameter_types(download_pdf, (), kwargs)
+
+        self.assertEqual(self.seen[0][1]["pdf_generator"], "chrome")
+        self.assertEqual(result_kwargs["pdf_generator"], "puppeteer")
+        # The caller's dict is left alone
+        self.assertEqual(kwargs["pdf_generator"], "puppeteer")
+
+    def test_positional_puppeteer_is_validated_as_chrome_and_restored(self):
+        args = ("Sales Invoice", "SINV-0001", None, None, 0, None, None, "puppeteer")
+        result_args, _ = patched_transform_parameter_types(download_pdf, args, {})
+
+        self.assertEqual(self.seen[0][0][7], "chrome")
+        self.assertEqual(result_args[7], "puppeteer")
+        self.assertEqual(args[7], "puppeteer")
+
+    def test_other_generators_pass_through(self):
+        kwargs = {"doctype": "Sales Invoice", "name": "SINV-0001", "pdf_generator": "chrome"}
+        _, result_kwargs = patched_transform_parameter_types(download_pdf, (), kwargs)
+
+        self.assertEqual(self.seen[0][1]["pdf_generator"], "chrome")
+        self.assertEqual(result_kwargs["pdf_generator"], "chrome")
+
+    def test_unrelated_calls_pass_through(self):
+        result = patched_transform_parameter_types(unrelated, ("Sales Invoice", "puppeteer"), {})
+
+        self.assertEqual(self.seen, [(["Sales Invoice", "puppeteer"], {})])
+        self.assertEqual(result, (["Sales Invoice", "puppeteer"], {}))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,263 @@
+"""
+Tests for the persistent worker's framing, respawn, recycling and timeout handling.
+
+A stub Node script stands in for puppeteer_pdf_server.js: it speaks the same protocol
+but "renders" by echoing the HTML, and misbehaves on request (see STUB_SERVER).
+"""
+
+import asyncio
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from pdf_puppeteer import worker
+from pdf_puppeteer.worker import (
+    PartialOutputError,
+    PuppeteerSocketServer,
+    PuppeteerWorker,
+    RenderError,
+    WorkerError,
+    render_async,
+)
+
+# The HTML selects the behaviour:
+#   "error:<message>"  -> error frame
+#   "crash"            -> exit without answering
+#   "crash-once:<path>" -> exit without answering unless <path> exists (creating it)
+#   "partial"          -> send half a PDF, then exit
+#   "hang"             -> never answer
+#   anything else      -> "%PDF-<html>|<pool size>"
+STUB_SERVER = r"""
+const fs = require('fs');
+const net = require('net');
+
+function frame(status, body) {
+    const header = Buffer.alloc(5);
+    header.writeUInt8(status, 0);
+    header.writeUInt32LE(body.length, 1);
+    return Buffer.concat([header, body]);
+}
+
+function answer(html, output) {
+    if (html.startsWith('error:')) {
+        output.write(frame(1, Buffer.from(html.slice(6))));
+    } else if (html === 'crash') {
+        process.exit(1);
+    } else if (html.startsWith('crash-once:')) {
+        const marker = html.slice(11);
+        if (!fs.existsSync(marker)) {
+            fs.writeFileSync(marker, '');
+            process.exit(1);
+        }
+        output.write(frame(0, Buffer.from('%PDF-ok')));
+    } else if (html === 'partial') {
+        const header = Buffer.alloc(5);
+        header.writeUInt32LE(100, 1);
+        output.write(Buffer.concat([header, Buffer.from('%PDF-')]), () => process.exit(1));
+    } else if (html !== 'hang') {
+        output.write(frame(0, Buffer.from(`%PDF-${html}|${process.env.PDF_PUPPETEER_POOL_SIZE}`)));
+    }
+}
+
+function serve(input, output) {
+    let buffered = Buffer.alloc(0);
+    input.on('data', chunk => {
+        buffered = Buffer.concat([buffered, chunk]);
+        while (buffered.length >= 4 && buffered.length >= 4 + buffered.readUInt32LE(0)) {
+            const length = buffered.readUInt32LE(0);
+            const { html } = JSON.parse(buffered.subarray(4, 4 + length).toString('utf8'));
+            buffered = buffered.subarray(4 + length);
+            answer(html, output);
+        }
+    });
+}
+
+if (process.argv[2] === '--socket') {
+    const server = net.createServer(socket => serve(socket, socket));
+    server.listen(process.argv[3], () => process.stdout.write('ready\n'));
+    process.stdin.resume();
+    process.stdin.on('end', () => process.exit(0));
+} else {
+    serve(process.stdin, process.stdout);
+    process.stdin.on('end', () => process.exit(0));
+}
+"""
+
+_tmpdir = None
+_script = None
+
+def setUpModule():
+    global _tmpdir, _script
+    _tmpdir = tempfile.mkdtemp()
+    _script = os.path.join(_tmpdir, "stub_server.js")
+    with open(_script, "w") as f:
+        f.write(STUB_SERVER)
+
+def tearDownModule():
+    shutil.rmtree(_tmpdir)
+
+class FailingWriter(io.BytesIO):
+    """Output whose first write fails, as a full disk or a job timeout signal would."""
+
+    def __init__(self):
+        super().__init__()
+        self.failed = False
+
+    def write(self, data):
+        if not self.failed:
+            self.failed = True
+            raise RuntimeError("write failed")
+        return super().write(data)
+
+class ShortWritePipe:
+    """Pipe whose writes stop short, as a write interrupted by a signal does."""
+
+    def __init__(self, pipe):
+        self.pipe = pipe
+
+    def write(self, data):
+        return self.pipe.write(data[:7])
+
+    def close(self):
+        self.pipe.close()
+
+@unittest.skipUnless(shutil.which("node"), "node is not installed")
+class TestPuppeteerWorker(unittest.TestCase):
+    def setUp(self):
+        self.worker = PuppeteerWorker(_script)
+        self.addCleanup(self.worker.stop)
+
+    def render(self, html, **kwargs):
+        output = io.BytesIO()
+        self.worker.render(html, "{}", output, **kwargs)
+        return output.getvalue()
+
+    def test_render_reuses_the_process(self):
+        self.assertEqual(self.render("a"), b"%PDF-a|1")
+        pid = self.worker.proc.pid
+        self.assertEqual(self.render("b"), b"%PDF-b|1")
+        self.assertEqual(self.worker.proc.pid, pid)
+
+    def test_error_frame_keeps_the_worker(self):
+        self.render("a")
+        pid = self.worker.proc.pid
+        with self.assertRaises(RenderError) as ctx:
+            self.render("error:bad html")
+        self.assertEqual(str(ctx.exception), "bad html")
+        self.assertEqual(self.render("b"), b"%PDF-b|1")
+        self.assertEqual(self.worker.proc.pid, pid)
+
+    def test_failed_write_does_not_desync_the_next_request(self):
+        with self.assertRaises(RuntimeError):
+            self.worker.render("a" * 100000, "{}", FailingWriter())
+        self.assertEqual(self.render("b", timeout=5), b"%PDF-b|1")
+
+    def test_short_writes_are_completed(self):
+        self.render("a")
+        pipe = self.worker.proc.stdin
+        self.worker.proc.stdin = ShortWritePipe(pipe)
+        self.assertEqual(self.render("b" * 1000, timeout=5), b"%PDF-" + b"b" * 1000 + b"|1")
+
+    def test_respawns_after_a_crash(self):
+        marker = os.path.join(_tmpdir, "crashed-once")
+        self.assertEqual(self.render(f"crash-once:{marker}"), b"%PDF-ok")
+
+    def test_gives_up_after_a_second_crash(self):
+        with self.assertRaises(WorkerError):
+            self.render("crash")
+        self.assertEqual(self.render("b"), b"%PDF-b|1")
+
+    def test_exit_mid_pdf_is_not_retried(self):
+        with self.assertRaises(PartialOutputError):
+            self.render("partial")
+        self.assertEqual(self.render("b"), b"%PDF-b|1")
+
+    def test_timeout_discards_the_worker(self):
+        self.render("a")
+        pid = self.worker.proc.pid
+        with self.assertRaises(TimeoutError):
+            self.render("hang", timeout=0.5)
+        self.assertEqual(self.render("b"), b"%PDF-b|1")
+        self.assertNotEqual(self.worker.proc.pid, pid)
+
+    def test_recycles_after_max_jobs(self):
+        self.worker.max_jobs = 2
+        self.render("a")
+        pid = self.worker.proc.pid
+        self.render("b")
+        self.render("c")
+        self.assertNotEqual(self.worker.proc.pid, pid)
+
+@unittest.skipUnless(shutil.which("node"), "node is not installed")
+class TestPuppeteerSocketServer(unittest.TestCase):
+    def setUp(self):
+        self.server = PuppeteerSocketServer(_script, pool_size=3)
+        self.addCleanup(self.server.stop)
+
+    def render(self, html):
+        socket_path = self.server.acquire()
+        try:
+            return asyncio.run(render_async(socket_path, html, "{}", timeout=5))
+        finally:
+            self.server.release()
+
+    def test_render_concurrently(self):
+        socket_path = self.server.ensure_started()
+
+        async def run():
+            return await asyncio.gather(*[render_async(socket_path, str(i), "{}") for i in range(5)])
+
+        self.assertEqual(asyncio.run(run()), [f"%PDF-{i}|3".encode() for i in range(5)])
+
+    def test_error_frame(self):
+        with self.assertRaises(RenderError):
+            self.render("error:bad html")
+
+    def test_starts_over_a_stale_socket_file(self):
+        stale = os.path.join(tempfile.gettempdir(), f"pdf_puppeteer-{os.getpid()}.sock")
+        with open(stale, "w"):
+            pass
+        self.assertEqual(self.render("a"), b"%PDF-a|3")
+
+    def test_removes_its_socket_on_stop(self):
+        socket_path = self.server.ensure_started()
+        self.server.stop()
+        self.assertFalse(os.path.exists(socket_path))
+
+    def test_recycles_after_max_jobs(self):
+        self.server.max_jobs = 2
+        self.render("a")
+        pid = self.server.proc.pid
+        self.render("b")
+        self.render("c")
+        self.assertNotEqual(self.server.proc.pid, pid)
+
+    def test_waits_for_requests_in_flight_before_recycling(self):
+        self.server.max_jobs = 1
+        self.server.acquire()
+        pid = self.server.proc.pid
+        self.render("a")
+        self.assertEqual(self.server.proc.pid, pid)
+        self.server.release()
+        self.render("b")
+        self.assertNotEqual(self.server.proc.pid, pid)
+
+    def test_stop_if_idle(self):
+        self.server.acquire()
+        self.server.stop_if_idle()
+        self.assertTrue(self.server.is_alive())
+        self.server.release()
+        self.server.stop_if_idle()
+        self.assertFalse(self.server.is_alive())
+
+    def test_pool_size_from_environment(self):
+        os.environ["PDF_PUPPETEER_POOL_SIZE"] = "5"
+        self.addCleanup(os.environ.pop, "PDF_PUPPETEER_POOL_SIZE")
+        self.assertEqual(PuppeteerSocketServer(_script).pool_size, 5)
+        os.environ["PDF_PUPPETEER_POOL_SIZE"] = "many"
+        self.assertEqual(PuppeteerSocketServer(_script).pool_size, worker.SOCKET_POOL_SIZE)
+
+if __name__ == "__main__":
+    unittest.main()
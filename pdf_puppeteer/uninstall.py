@@ -1,4 +1,6 @@
+import frappe
 from .install import remove_pdf_generator_option
 
 def before_uninstall():
-    remove_pdf_generator_option()
\ No newline at end of file
+    remove_pdf_generator_option()
+    frappe.db.commit()
\ No newline at end of file
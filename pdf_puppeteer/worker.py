@@ -0,0 +1,301 @@
+"""
+Persistent Node/Puppeteer worker.
+
+Spawning `node puppeteer_pdf.js` for every PDF re-initializes Node and relaunches
+Chromium each time. This module keeps a single `puppeteer_pdf_server.js` process
+alive per Frappe worker process and talks to it over stdin/stdout using
+length-prefixed frames (see the protocol notes in puppeteer_pdf_server.js).
+
+Batch rendering uses a second instance of the same script listening on a Unix
+socket, so asyncio callers can keep several PDFs in flight at once.
+"""
+
+import asyncio
+import atexit
+import json
+import os
+import select
+import struct
+import subprocess
+import tempfile
+import threading
+import time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Recycle the Node process (and its browser) after this many PDFs to bound memory
+MAX_JOBS_PER_WORKER = 200
+# Warm pages kept by the socket server, i.e. how many PDFs it renders concurrently;
+# overridden by the PDF_PUPPETEER_POOL_SIZE environment variable
+SOCKET_POOL_SIZE = 8
+
+_REQUEST_HEADER = struct.Struct("<I")
+_RESPONSE_HEADER = struct.Struct("<BI")
+_STATUS_OK = 0
+
+class WorkerError(Exception):
+    """Raised when the persistent worker cannot produce a PDF."""
+
+class RenderError(WorkerError):
+    """Raised when the worker is healthy but Puppeteer failed to render the HTML."""
+
+class PartialOutputError(WorkerError):
+    """Raised when the worker died after part of the PDF had already been written to the output."""
+
+class PuppeteerWorker:
+    """A long-lived `node puppeteer_pdf_server.js` child process."""
+
+    def __init__(self, script_path, max_jobs=MAX_JOBS_PER_WORKER):
+        self.script_path = script_path
+        self.max_jobs = max_jobs
+        self.proc = None
+        self.pid = None
+        self.jobs = 0
+        self.lock = threading.Lock()
+
+    def is_alive(self):
+        """Health check: the child is running and belongs to this process (not a forked parent's)."""
+        return self.proc is not None and self.pid == os.getpid() and self.proc.poll() is None
+
+    def start(self):
+        self.proc = subprocess.Popen(
+            ["node", self.script_path],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            bufsize=0,
+            cwd=os.path.dirname(self.script_path),
+            # Requests arrive one at a time over stdin, so a single page is all this worker uses
+            env=dict(os.environ, PDF_PUPPETEER_POOL_SIZE="1"),
+        )
+        self.pid = os.getpid()
+        self.jobs = 0
+
+    def stop(self):
+        proc, self.proc = self.proc, None
+        if proc is None or self.pid != os.getpid():
+            return
+        try:
+            proc.stdin.close()
+            proc.wait(timeout=5)
+        except Exception:
+            proc.kill()
+            proc.wait()
+        finally:
+            proc.stdout.close()
+
+    def render(self, html, options_json, output, timeout=30):
+        """
+        Render `html` to PDF, streaming the bytes into `output.write`.
+        Respawns the worker once if its pipe breaks before any PDF bytes are written.
+        """
+        with self.lock:
+            if self.is_alive() and self.jobs >= self.max_jobs:
+                self.stop()
+            for attempt in range(2):
+                if not self.is_alive():
+                    self.start()
+                try:
+                    self._request(html, options_json, output, timeout)
+                except (BrokenPipeError, EOFError):
+                    self.stop()
+                    if attempt:
+                        raise WorkerError("Puppeteer worker exited unexpectedly.")
+                    continue
+                self.jobs += 1
+                return
+
+    def _request(self, html, options_json, output, timeout):
+        deadline = time.monotonic() + timeout
+        try:
+            self._write_all(_encode_request(html, options_json))
+            status, length = _RESPONSE_HEADER.unpack(self._read_exact(_RESPONSE_HEADER.size, deadline))
+            if status != _STATUS_OK:
+                raise RenderError(self._read_exact(length, deadline).decode("utf-8", errors="replace"))
+            try:
+                for chunk in self._iter_chunks(length, deadline):
+                    output.write(chunk)
+            except EOFError:
+                # Part of the PDF is already in `output`, so this can't be retried
+                raise PartialOutputError("Puppeteer worker exited while sending the PDF.")
+        except RenderError:
+            # The error body was read in full, so the worker is still in step and reusable
+            raise
+        except BaseException:
+            # Anything else (a timeout, a dead child, a failing output.write, a job timeout
+            # signal) may leave part of the request or response in the pipes; the child
+            # can't be reused, as the next request would read those bytes as its header
+            self.proc.kill()
+            self.stop()
+            raise
+
+    def _write_all(self, data):
+        # stdin is an unbuffered pipe: a signal can cut a write short, and Node would then
+        # wait for the rest of the frame until the request times out
+        view = memoryview(data)
+        while view:
+            view = view[self.proc.stdin.write(view):]
+
+    def _read_exact(self, size, deadline):
+        return b"".join(self._iter_chunks(size, deadline))
+
+    def _iter_chunks(self, size, deadline):
+        """Yield exactly `size` bytes from the child's stdout as they arrive."""
+        fd = self.proc.stdout.fileno()
+        # poll rather than select: select fails outright for fds >= 1024 in long-lived processes
+        poller = select.poll()
+        poller.register(fd, select.POLLIN)
+        remaining = size
+        while remaining:
+            if not poller.poll(max(deadline - time.monotonic(), 0) * 1000):
+                raise TimeoutError
+            chunk = os.read(fd, min(remaining, 1 << 16))
+            if not chunk:
+                raise EOFError
+            remaining -= len(chunk)
+            yield chunk
+
+class PuppeteerSocketServer(PuppeteerWorker):
+    """A long-lived `node puppeteer_pdf_server.js --socket` process serving concurrent requests."""
+
+    def __init__(self, script_path, pool_size=None):
+        super().__init__(script_path)
+        self.pool_size = pool_size or _configured_pool_size()
+        self.socket_path = None
+        # Requests currently holding the server; it is only recycled once none are in flight
+        self.active = 0
+        self.active_lock = threading.Lock()
+
+    def start(self, timeout=30):
+        self.socket_path = os.path.join(tempfile.gettempdir(), f"pdf_puppeteer-{os.getpid()}.sock")
+        # A crashed process that had our PID (common in containers) may have left this path behind
+        _unlink(self.socket_path)
+        self.proc = subprocess.Popen(
+            ["node", self.script_path, "--socket", self.socket_path],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            bufsize=0,
+            cwd=os.path.dirname(self.script_path),
+            env=dict(os.environ, PDF_PUPPETEER_POOL_SIZE=str(self.pool_size)),
+        )
+        self.pid = os.getpid()
+        self.jobs = 0
+        try:
+            ready = self._read_exact(len(b"ready\n"), time.monotonic() + timeout)
+        except (EOFError, TimeoutError):
+            ready = None
+        if ready != b"ready\n":
+            self.proc.kill()
+            self.stop()
+            raise WorkerError("Puppeteer socket server failed to start.")
+
+    def stop(self):
+        super().stop()
+        self._remove_socket()
+
+    def ensure_started(self):
+        """Start the server if it isn't running and return its socket path."""
+        with self.lock:
+            if not self.is_alive():
+                self.start()
+            return self.socket_path
+
+    def acquire(self):
+        """
+        Reserve the server for one request and return its socket path; pair with `release`.
+        Once `max_jobs` requests have been served, the server is recycled at its next idle moment.
+        """
+        with self.lock:
+            if self.is_alive() and self.jobs >= self.max_jobs and not self.active:
+                self.stop()
+            if not self.is_alive():
+                self.start()
+            self.jobs += 1
+            with self.active_lock:
+                self.active += 1
+            return self.socket_path
+
+    def release(self):
+        with self.active_lock:
+            self.active -= 1
+
+    def stop_if_idle(self):
+        """Stop the server, and its browser, unless requests are still in flight."""
+        with self.lock:
+            if not self.active:
+                self.stop()
+
+    def _remove_socket(self):
+        if self.socket_path and self.pid == os.getpid():
+            _unlink(self.socket_path)
+
+def _configured_pool_size():
+    try:
+        return max(int(os.environ["PDF_PUPPETEER_POOL_SIZE"]), 1)
+    except (KeyError, ValueError):
+        return SOCKET_POOL_SIZE
+
+def _unlink(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+async def render_async(socket_path, html, options_json, timeout=30):
+    """Render `html` to PDF bytes on the socket server over a dedicated connection."""
+    async def exchange():
+        reader, writer = await asyncio.open_unix_connection(socket_path)
+        try:
+            writer.write(_encode_request(html, options_json))
+            await writer.drain()
+            status, length = _RESPONSE_HEADER.unpack(await reader.readexactly(_RESPONSE_HEADER.size))
+            body = await reader.readexactly(length)
+        finally:
+            writer.close()
+        if status != _STATUS_OK:
+            raise RenderError(body.decode("utf-8", errors="replace"))
+        return body
+
+    try:
+        return await asyncio.wait_for(exchange(), timeout)
+    except asyncio.TimeoutError:
+        raise TimeoutError
+    except (asyncio.IncompleteReadError, ConnectionError, FileNotFoundError) as e:
+        raise WorkerError(f"Puppeteer socket server connection failed: {str(e)}")
+
+def dumps(obj):
+    """Serialize `obj` to JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode("utf-8")
+
+def _encode_request(html, options_json):
+    # options_json arrives pre-encoded (and cached) from the generator
+    payload = b'{"options":' + options_json.encode("utf-8") + b',"html":' + dumps(html) + b"}"
+    return _REQUEST_HEADER.pack(len(payload)) + payload
+
+_worker = None
+_socket_server = None
+_worker_lock = threading.Lock()
+
+def get_worker(script_path):
+    """Return the per-process worker, creating it on first use."""
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                _worker = PuppeteerWorker(script_path)
+                atexit.register(_worker.stop)
+    return _worker
+
+def get_socket_server(script_path):
+    """Return the per-process socket server, creating it on first use."""
+    global _socket_server
+    if _socket_server is None:
+        with _worker_lock:
+            if _socket_server is None:
+                _socket_server = PuppeteerSocketServer(script_path)
+                atexit.register(_socket_server.stop)
+    return _socket_server
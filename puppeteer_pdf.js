@@ -3,14 +3,13 @@ const fs = require('fs').promises;
 const path = require('path');
 
 /**
- * Generate PDF from HTML string.
- * @param {string} html - HTML content
- * @param {object} options - PDF options (format, margin, landscape, etc.)
- * @returns {Promise<Buffer>} PDF buffer
+ * Find the first available Chromium/Chrome executable on the system.
+ * @returns {string} Path to the browser executable
  */
-async function generatePdfFromHtml(html, options = {}) {
+function findBrowserExecutable() {
     // Try to find available browser executables
     const browserPaths = [
+        process.env.CHROMIUM_PATH,    // Explicitly configured browser
         '/usr/bin/chromium-browser',  // Standard Chromium on Ubuntu/Debian
         '/usr/bin/chromium',          // Alternative Chromium path
         '/usr/bin/google-chrome',     // Google Chrome stable
@@ -23,27 +22,33 @@ async function generatePdfFromHtml(html, options = {}) {
     ];
 
     // Find the first available browser
-    let executablePath = null;
     for (const path of browserPaths) {
+        if (!path) {
+            continue;
+        }
         try {
             // Check if the browser exists and is executable
             require('fs').accessSync(path, require('fs').constants.X_OK);
-            executablePath = path;
-            console.log(`🔍 Using browser at: ${path}`);
-            break;
+            // stdout carries the PDF, so diagnostics go to stderr
+            console.error(`🔍 Using browser at: ${path}`);
+            return path;
         } catch (e) {
             // Browser not found at this path, try next one
         }
     }
 
-    if (!executablePath) {
-        throw new Error('No supported browser found. Please install Chromium or Google Chrome. ' +
-                       'Supported browsers: chromium-browser, chromium, google-chrome, google-chrome-stable');
-    }
+    throw new Error('No supported browser found. Please install Chromium or Google Chrome. ' +
+                   'Supported browsers: chromium-browser, chromium, google-chrome, google-chrome-stable');
+}
 
-    const browser = await puppeteer.launch({
+/**
+ * Launch a headless browser instance.
+ * @returns {Promise<import('puppeteer').Browser>} Browser instance
+ */
+async function launchBrowser() {
+    return puppeteer.launch({
         headless: 'new',
-        executablePath: executablePath,
+        executablePath: findBrowserExecutable(),
         args: [
             '--no-sandbox',
             '--disable-setuid-sandbox',
@@ -52,34 +57,67 @@ async function generatePdfFromHtml(html, options = {}) {
             '--disable-gpu',
         ],
     });
+}
 
-    try {
-        const page = await browser.newPage();
-        await page.setViewport({ width: 1920, height: 1080 });
+/**
+ * Render HTML into a PDF on an already open page.
+ * @param {import('puppeteer').Page} page - Page to render on
+ * @param {string} html - HTML content
+ * @param {object} options - PDF options (format, margin, landscape, etc.)
+ * @returns {Promise<Buffer>} PDF buffer
+ */
+async function renderPdf(page, html, options = {}) {
+    // Write HTML to a temporary file to load as file:// URL
+    // This ensures relative resources (images, CSS) are resolved if they are relative to the temp directory.
+    // However, we'll use setContent for simplicity; if resources are absolute URLs they will work.
+    await page.setContent(html, { waitUntil: 'networkidle0', timeout: 30000 });
 
-        // Write HTML to a temporary file to load as file:// URL
-        // This ensures relative resources (images, CSS) are resolved if they are relative to the temp directory.
-        // However, we'll use setContent for simplicity; if resources are absolute URLs they will work.
-        await page.setContent(html, { waitUntil: 'networkidle0', timeout: 30000 });
+    const pdfOptions = {
+        format: options.format || 'A4',
+        printBackground: options.printBackground !== false,
+        margin: options.margin || { top: '1cm', right: '1cm', bottom: '1cm', left: '1cm' },
+        landscape: options.landscape || false,
+        ...options,
+    };
 
-        const pdfOptions = {
-            format: options.format || 'A4',
-            printBackground: options.printBackground !== false,
-            margin: options.margin || { top: '1cm', right: '1cm', bottom: '1cm', left: '1cm' },
-            landscape: options.landscape || false,
-            ...options,
-        };
+    return page.pdf(pdfOptions);
+}
+
+/**
+ * Generate PDF from HTML string.
+ * @param {string} html - HTML content
+ * @param {object} options - PDF options (format, margin, landscape, etc.)
+ * @returns {Promise<Buffer>} PDF buffer
+ */
+async function generatePdfFromHtml(html, options = {}) {
+    const browser = await launchBrowser();
 
-        const pdfBuffer = await page.pdf(pdfOptions);
-        return pdfBuffer;
+    try {
+        const page = await browser.newPage();
+        await page.setViewport({ width: 1920, height: 1080 });
+        return await renderPdf(page, html, options);
     } finally {
         await browser.close();
     }
 }
 
 /**
- * CLI usage: node puppeteer_pdf.js <input_html_file> <output_pdf_file> [options_json_file]
+ * Read all of stdin as a UTF-8 string.
+ * @returns {Promise<string>} stdin contents
+ */
+function readStdin() {
+    return new Promise((resolve, reject) => {
+        const chunks = [];
+        process.stdin.on('data', chunk => chunks.push(chunk));
+        process.stdin.on('end', () => resolve(Buffer.concat(chunks).toString('utf8')));
+        process.stdin.on('error', reject);
+    });
+}
+
+/**
+ * CLI usage: node puppeteer_pdf.js <input_html_file> <output_pdf_file> [options_json_file | options_json]
  * or read HTML from stdin and output PDF to stdout with options from environment PDF_OPTIONS_JSON.
+ * Either file may be given as "-" to use stdin/stdout instead.
  */
 async function main() {
     const args = process.argv.slice(2);
@@ -92,37 +130,37 @@ async function main() {
             console.error('Failed to parse PDF_OPTIONS_JSON:', e.message);
         }
     }
-    // If third argument is provided, treat as options JSON file
+    // If third argument is provided, treat as inline options JSON or an options JSON file
     if (args.length >= 3) {
         try {
-            const optionsJson = await fs.readFile(args[2], 'utf8');
+            const optionsJson = args[2].trimStart().startsWith('{') ? args[2] : await fs.readFile(args[2], 'utf8');
             options = { ...options, ...JSON.parse(optionsJson) };
         } catch (e) {
-            console.error('Failed to read options file:', e.message);
+            console.error('Failed to read options:', e.message);
         }
     }
 
     if (args.length === 0) {
         // Read HTML from stdin
-        const html = await new Promise((resolve) => {
-            let data = '';
-            process.stdin.on('data', chunk => data += chunk);
-            process.stdin.on('end', () => resolve(data));
-        });
+        const html = await readStdin();
         const pdf = await generatePdfFromHtml(html, options);
         process.stdout.write(pdf);
     } else if (args.length >= 2) {
-        // Input file and output file
+        // Input file and output file ("-" for stdin/stdout)
         const inputFile = args[0];
         const outputFile = args[1];
-        const html = await fs.readFile(inputFile, 'utf8');
+        const html = inputFile === '-' ? await readStdin() : await fs.readFile(inputFile, 'utf8');
         const pdf = await generatePdfFromHtml(html, options);
-        await fs.writeFile(outputFile, pdf);
-        console.log(`PDF written to ${outputFile}`);
+        if (outputFile === '-') {
+            process.stdout.write(pdf);
+        } else {
+            await fs.writeFile(outputFile, pdf);
+            console.log(`PDF written to ${outputFile}`);
+        }
     } else {
-        console.error('Usage: node puppeteer_pdf.js [input.html output.pdf [options.json]]');
-        console.error('If no arguments, reads HTML from stdin and writes PDF to stdout.');
-        console.error('Options can be provided via environment variable PDF_OPTIONS_JSON (JSON string) or via options.json file.');
+        console.error('Usage: node puppeteer_pdf.js [input.html output.pdf [options.json | \'{...}\']]');
+        console.error('If no arguments, or "-" for input/output, reads HTML from stdin and writes PDF to stdout.');
+        console.error('Options can be provided via environment variable PDF_OPTIONS_JSON (JSON string), an options.json file or an inline JSON argument.');
         process.exit(1);
     }
 }
@@ -134,4 +172,4 @@ if (require.main === module) {
     });
 }
 
-module.exports = { generatePdfFromHtml };
\ No newline at end of file
+module.exports = { findBrowserExecutable, launchBrowser, renderPdf, generatePdfFromHtml };
@@ -0,0 +1,191 @@
+const net = require('net');
+const { launchBrowser, renderPdf } = require('./puppeteer_pdf');
+
+/**
+ * Long-lived PDF worker.
+ *
+ * Launches the browser once and renders every request on a pool of warm pages,
+ * so callers only pay the Node/Chromium startup cost on the first PDF.
+ *
+ * Protocol (little-endian), spoken over stdin/stdout or, when started with
+ * `--socket <path>`, over each connection to a Unix socket:
+ *   request:  uint32 length + JSON payload {"html": "...", "options": {...}}
+ *   response: uint8 status (0 = ok, 1 = error) + uint32 length + body
+ *             body is the PDF on success, a UTF-8 error message otherwise.
+ *
+ * In socket mode connections are served concurrently, up to the page pool size,
+ * and "ready" is written to stdout once the socket is listening. The server
+ * exits when stdin closes, so it never outlives its parent.
+ */
+
+const POOL_SIZE = Math.max(parseInt(process.env.PDF_PUPPETEER_POOL_SIZE, 10) || 1, 1);
+
+/**
+ * Fixed-size pool of browser pages handed out one request at a time.
+ */
+class PagePool {
+    constructor(browser, size) {
+        this.browser = browser;
+        this.size = size;
+        this.idle = [];
+        this.waiters = [];
+    }
+
+    async init() {
+        for (let i = 0; i < this.size; i++) {
+            this.idle.push(await this.newPage());
+        }
+    }
+
+    async newPage() {
+        const page = await this.browser.newPage();
+        await page.setViewport({ width: 1920, height: 1080 });
+        return page;
+    }
+
+    acquire() {
+        if (this.idle.length) {
+            return Promise.resolve(this.idle.pop());
+        }
+        return new Promise(resolve => this.waiters.push(resolve));
+    }
+
+    release(page) {
+        const waiter = this.waiters.shift();
+        if (waiter) {
+            waiter(page);
+        } else {
+            this.idle.push(page);
+        }
+    }
+
+    /**
+     * Replace a page that failed mid-render so later requests start clean.
+     */
+    async discard(page) {
+        await page.close().catch(() => {});
+        this.release(await this.newPage());
+    }
+
+    async run(fn) {
+        const page = await this.acquire();
+        let result;
+        try {
+            result = await fn(page);
+        } catch (e) {
+            await this.discard(page);
+            throw e;
+        }
+        this.release(page);
+        return result;
+    }
+}
+
+/**
+ * Encode a response frame.
+ * @param {number} status - 0 for success, 1 for error
+ * @param {Buffer} body - PDF bytes or error message
+ * @returns {Buffer} Framed response
+ */
+function encodeFrame(status, body) {
+    const header = Buffer.alloc(5);
+    header.writeUInt8(status, 0);
+    header.writeUInt32LE(body.length, 1);
+    return Buffer.concat([header, body]);
+}
+
+/**
+ * Render a single framed request payload into a framed response.
+ * @param {PagePool} pool - Page pool to render on
+ * @param {Buffer} payload - JSON request payload
+ * @returns {Promise<Buffer>} Framed response
+ */
+async function handleRequest(pool, payload) {
+    try {
+        const { html, options } = JSON.parse(payload.toString('utf8'));
+        const pdf = await pool.run(page => renderPdf(page, html, options || {}));
+        return encodeFrame(0, Buffer.from(pdf));
+    } catch (e) {
+        return encodeFrame(1, Buffer.from(String(e && e.stack ? e.stack : e), 'utf8'));
+    }
+}
+
+/**
+ * Split a byte stream into request frames and answer them in order.
+ * @param {import('stream').Readable} input - Stream carrying request frames
+ * @param {import('stream').Writable} output - Stream receiving response frames
+ * @param {PagePool} pool - Page pool to render on
+ * @returns {function(): Promise<void>} Resolves once every received frame is answered
+ */
+function serveFrames(input, output, pool) {
+    let buffered = Buffer.alloc(0);
+    let queue = Promise.resolve();
+
+    input.on('data', chunk => {
+        buffered = Buffer.concat([buffered, chunk]);
+        while (buffered.length >= 4) {
+            const length = buffered.readUInt32LE(0);
+            if (buffered.length < 4 + length) {
+                break;
+            }
+            const payload = buffered.subarray(4, 4 + length);
+            buffered = buffered.subarray(4 + length);
+            // Responses are written in request order
+            queue = queue
+                .then(() => handleRequest(pool, payload))
+                .then(frame => new Promise(resolve => output.write(frame, resolve)));
+        }
+    });
+
+    return () => queue;
+}
+
+async function main() {
+    const args = process.argv.slice(2);
+    const socketPath = args[0] === '--socket' ? args[1] : null;
+
+    const browser = await launchBrowser();
+    let closing = false;
+    // A dead browser can't serve anything; exit so the parent respawns us.
+    browser.on('disconnected', () => {
+        if (!closing) {
+            process.exit(1);
+        }
+    });
+
+    const pool = new PagePool(browser, POOL_SIZE);
+    await pool.init();
+
+    let drain = () => Promise.resolve();
+    if (socketPath) {
+        const server = net.createServer(socket => {
+            serveFrames(socket, socket, pool);
+            socket.on('error', () => socket.destroy());
+        });
+        await new Promise((resolve, reject) => {
+            server.once('error', reject);
+            server.listen(socketPath, resolve);
+        });
+        process.stdout.write('ready\n');
+        // Keep reading stdin so 'end' fires when the parent goes away
+        process.stdin.resume();
+    } else {
+        drain = serveFrames(process.stdin, process.stdout, pool);
+    }
+
+    process.stdin.on('end', async () => {
+        await drain();
+        closing = true;
+        await browser.close();
+        process.exit(0);
+    });
+}
+
+if (require.main === module) {
+    main().catch(err => {
+        console.error(err);
+        process.exit(1);
+    });
+}
+
+module.exports = { PagePool, encodeFrame, handleRequest, serveFrames };